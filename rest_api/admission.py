@@ -0,0 +1,184 @@
+"""
+Admission control for the API resources.
+
+Every route gets its own concurrency limit, with separate budgets for reads
+(GET) and writes (everything else). A request that finds its budget spent
+waits in a short bounded queue; when the queue is full or the wait times out
+it is rejected straight away with 503 and `Retry-After` instead of piling up
+on SQLite. Each client is additionally throttled by a token bucket and gets
+429 when it runs dry.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Flask, current_app, request
+
+from db import READ_METHODS
+
+DEFAULT_CONFIG: Dict[str, object] = {
+    'ADMISSION_READ_CONCURRENCY': 8,
+    'ADMISSION_WRITE_CONCURRENCY': 2,
+    'ADMISSION_QUEUE_SIZE': 16,
+    'ADMISSION_QUEUE_TIMEOUT': 0.5,
+    'ADMISSION_RETRY_AFTER': 1,
+    # {endpoint: {'read': n, 'write': n}} overrides the defaults above
+    'ADMISSION_ROUTE_LIMITS': {},
+    'RATE_LIMIT_PER_SECOND': 20.0,
+    'RATE_LIMIT_BURST': 40,
+    'RATE_LIMIT_MAX_CLIENTS': 10000,
+}
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float) -> None:
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, on_queued: Callable[[], None]) -> bool:
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                return False
+            self.waiting += 1
+            on_queued()
+            try:
+                admitted = self._cond.wait_for(lambda: self.active < self.limit, self.queue_timeout)
+            finally:
+                self.waiting -= 1
+            if admitted:
+                self.active += 1
+            return admitted
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: int, max_clients: int) -> None:
+        if rate <= 0:
+            raise ValueError("RATE_LIMIT_PER_SECOND must be positive")
+        if burst < 1:
+            raise ValueError("RATE_LIMIT_BURST must be at least 1")
+        if max_clients < 1:
+            raise ValueError("RATE_LIMIT_MAX_CLIENTS must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # Least recently seen clients first, so the map can be capped as an LRU.
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client: str) -> float:
+        """
+        Take a token for `client`. Returns 0 when the request may proceed,
+        otherwise the number of seconds until a token is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                # Forgetting a client only hands it a fresh burst.
+                self._buckets.popitem(last=False)
+            return 0.0 if allowed else (1 - tokens) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionMetrics:
+    def __init__(self) -> None:
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {'admitted': 0, 'queued': 0, 'rejected': 0, 'rate_limited': 0}
+        )
+        self._lock = threading.Lock()
+
+    def incr(self, route: str, counter: str) -> None:
+        with self._lock:
+            self._counters[route][counter] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {route: dict(counters) for route, counters in self._counters.items()}
+
+
+class AdmissionController:
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self.metrics = AdmissionMetrics()
+        self._limiters: Dict[Tuple[str, str], ConcurrencyLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        self.rate_limiter: Optional[TokenBucketLimiter] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        for key, value in DEFAULT_CONFIG.items():
+            app.config.setdefault(key, value)
+        self.rate_limiter = TokenBucketLimiter(
+            app.config['RATE_LIMIT_PER_SECOND'],
+            app.config['RATE_LIMIT_BURST'],
+            app.config['RATE_LIMIT_MAX_CLIENTS'],
+        )
+        # Per-route limiters read the config when first used.
+        self._limiters.clear()
+        app.extensions['admission'] = self
+
+    def _get_limiter(self, endpoint: str, kind: str) -> ConcurrencyLimiter:
+        key = (endpoint, kind)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._limiters_lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    config = current_app.config
+                    default = config[f'ADMISSION_{kind.upper()}_CONCURRENCY']
+                    limit = config['ADMISSION_ROUTE_LIMITS'].get(endpoint, {}).get(kind, default)
+                    limiter = ConcurrencyLimiter(
+                        limit, config['ADMISSION_QUEUE_SIZE'], config['ADMISSION_QUEUE_TIMEOUT']
+                    )
+                    self._limiters[key] = limiter
+        return limiter
+
+    def limit(self, func: Callable) -> Callable:
+        """
+        Decorator for resource methods, meant for `Resource.method_decorators`.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            kind = 'read' if request.method in READ_METHODS else 'write'
+            route = f"{request.endpoint}:{kind}"
+
+            retry_after = self.rate_limiter.take(request.remote_addr or '')
+            if retry_after:
+                self.metrics.incr(route, 'rate_limited')
+                return ({"message": "Too many requests"}, 429,
+                        {'Retry-After': str(math.ceil(retry_after))})
+
+            limiter = self._get_limiter(request.endpoint, kind)
+            if not limiter.acquire(lambda: self.metrics.incr(route, 'queued')):
+                self.metrics.incr(route, 'rejected')
+                return ({"message": "Server is busy, try again later"}, 503,
+                        {'Retry-After': str(current_app.config['ADMISSION_RETRY_AFTER'])})
+
+            self.metrics.incr(route, 'admitted')
+            try:
+                return func(*args, **kwargs)
+            finally:
+                limiter.release()
+        return wrapper
@@ -0,0 +1,288 @@
+"""
+Bulk import and export of the catalog.
+
+    python catalog_cli.py import authors authors.csv
+    python catalog_cli.py import books books.ndjson --batch-size 50000
+    python catalog_cli.py export books - --format ndjson > books.ndjson
+
+Authors are matched by (first_name, middle_name, last_name) and books by
+title, so re-importing the same file does not create duplicates. Books carry
+their author's names rather than an author id and the author is created when
+missing, which keeps exports portable between databases.
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, IO, Iterable, Iterator, List, Optional
+
+from db import DATABASE
+from models import init_db_authors, init_db_books, init_db_author_stats
+
+FIELDS: Dict[str, List[str]] = {
+    'authors': ['first_name', 'middle_name', 'last_name'],
+    'books': ['title', 'first_name', 'middle_name', 'last_name'],
+}
+
+REQUIRED_FIELDS: Dict[str, List[str]] = {
+    'authors': ['first_name', 'last_name'],
+    'books': ['title', 'first_name', 'last_name'],
+}
+
+BULK_LOAD_PRAGMAS: List[str] = [
+    "PRAGMA synchronous = OFF;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -65536;",
+    "PRAGMA foreign_keys = OFF;",
+]
+
+LOOKUP_INDEXES: str = """
+    CREATE INDEX IF NOT EXISTS `idx_authors_name`
+        ON `table_authors` (first_name, last_name, COALESCE(middle_name, ''));
+    CREATE INDEX IF NOT EXISTS `idx_books_title`
+        ON `table_books` (title);
+"""
+
+_STAGING_TABLE: str = """
+    CREATE TEMP TABLE IF NOT EXISTS `staging` (
+        title TEXT,
+        first_name TEXT,
+        middle_name TEXT,
+        last_name TEXT
+    );
+"""
+
+_INSERT_MISSING_AUTHORS: str = """
+    INSERT INTO `table_authors` (first_name, middle_name, last_name)
+    SELECT DISTINCT s.first_name, s.middle_name, s.last_name
+    FROM `staging` s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM `table_authors` a
+        WHERE a.first_name = s.first_name
+          AND a.last_name = s.last_name
+          AND COALESCE(a.middle_name, '') = COALESCE(s.middle_name, '')
+    )
+"""
+
+_INSERT_MISSING_BOOKS: str = """
+    INSERT INTO `table_books` (title, author)
+    SELECT s.title, (
+        SELECT a.author_id FROM `table_authors` a
+        WHERE a.first_name = s.first_name
+          AND a.last_name = s.last_name
+          AND COALESCE(a.middle_name, '') = COALESCE(s.middle_name, '')
+        LIMIT 1
+    )
+    FROM `staging` s
+    WHERE NOT EXISTS (SELECT 1 FROM `table_books` b WHERE b.title = s.title)
+    GROUP BY s.title
+"""
+
+EXPORT_QUERIES: Dict[str, str] = {
+    'authors': """
+        SELECT first_name, middle_name, last_name
+        FROM `table_authors`
+        ORDER BY author_id
+    """,
+    'books': """
+        SELECT b.title, a.first_name, a.middle_name, a.last_name
+        FROM `table_books` b
+        JOIN `table_authors` a ON a.author_id = b.author
+        ORDER BY b.id
+    """,
+}
+
+
+class Progress:
+    def __init__(self, label: str, every: int, stream: IO = sys.stderr) -> None:
+        self.label = label
+        self.every = every
+        self.stream = stream
+        self.rows = 0
+        self.started = time.monotonic()
+        self._next_report = every
+
+    def advance(self, rows: int) -> None:
+        self.rows += rows
+        if self.rows >= self._next_report:
+            self.report()
+            self._next_report = self.rows + self.every
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def report(self, suffix: str = '') -> None:
+        print(f"{self.label}: {self.rows} rows, {self.rate():.0f} rows/s{suffix}", file=self.stream)
+
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    raise SystemExit(f"Cannot infer format of {path!r}, pass --format csv or --format ndjson")
+
+
+@contextmanager
+def _open(path: str, mode: str) -> Iterator[IO]:
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+        return
+    with open(path, mode, newline='', encoding='utf-8') as stream:
+        yield stream
+
+
+def read_records(stream: IO, fmt: str) -> Iterator[dict]:
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_records(stream: IO, fmt: str, fields: List[str], rows: Iterable[tuple]) -> Iterator[None]:
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row)
+            yield
+    else:
+        for row in rows:
+            stream.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n')
+            yield
+
+
+def _to_staging_row(entity: str, record: dict) -> Optional[tuple]:
+    if any(not record.get(field) for field in REQUIRED_FIELDS[entity]):
+        return None
+    return (
+        record.get('title'),
+        record['first_name'],
+        # An empty CSV cell and a missing key both mean no middle name, which
+        # the API stores as NULL.
+        record.get('middle_name') or None,
+        record['last_name'],
+    )
+
+
+def _drop_author_stats_triggers(cursor: sqlite3.Cursor) -> None:
+    cursor.execute(
+        """
+        SELECT name FROM sqlite_master
+        WHERE type='trigger' AND name LIKE 'trg_author_stats_%'
+        """
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"DROP TRIGGER `{name}`")
+    cursor.execute("DROP INDEX IF EXISTS `idx_author_stats_top`")
+
+
+def import_records(entity: str, records: Iterable[dict], batch_size: int, commit_every: int,
+                   progress: Progress) -> int:
+    """
+    Load records into the catalog in batches of `batch_size`, committing every
+    `commit_every` rows. The author_stats triggers and index are dropped for
+    the duration of the load; `init_db_author_stats` recomputes the counts at
+    the end. If the process dies before that, the counts are recomputed by the
+    next import or before the API serves its first request.
+    """
+    init_db_authors([])
+    init_db_books([])
+    init_db_author_stats()
+
+    conn = sqlite3.connect(DATABASE, isolation_level=None)
+    cursor: sqlite3.Cursor = conn.cursor()
+    for pragma in BULK_LOAD_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.executescript(LOOKUP_INDEXES)
+    cursor.executescript(_STAGING_TABLE)
+
+    inserted = 0
+    skipped = 0
+    uncommitted = 0
+    try:
+        cursor.execute("BEGIN")
+        _drop_author_stats_triggers(cursor)
+        records = iter(records)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            rows = [_to_staging_row(entity, record) for record in batch]
+            staged = [row for row in rows if row is not None]
+            skipped += len(rows) - len(staged)
+
+            cursor.executemany("INSERT INTO `staging` VALUES (?, ?, ?, ?)", staged)
+            before = conn.total_changes
+            cursor.execute(_INSERT_MISSING_AUTHORS)
+            if entity == 'books':
+                before = conn.total_changes
+                cursor.execute(_INSERT_MISSING_BOOKS)
+            inserted += conn.total_changes - before
+            cursor.execute("DELETE FROM `staging`")
+
+            uncommitted += len(batch)
+            if uncommitted >= commit_every:
+                cursor.execute("COMMIT")
+                cursor.execute("BEGIN")
+                uncommitted = 0
+            progress.advance(len(batch))
+        cursor.execute("COMMIT")
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+        init_db_author_stats()
+
+    progress.report(f" ({inserted} inserted, {skipped} skipped)")
+    return inserted
+
+
+def export_records(entity: str, stream: IO, fmt: str, batch_size: int, progress: Progress) -> int:
+    conn = sqlite3.connect(DATABASE)
+    try:
+        cursor: sqlite3.Cursor = conn.cursor()
+        cursor.arraysize = batch_size
+        cursor.execute(EXPORT_QUERIES[entity])
+        for _ in write_records(stream, fmt, FIELDS[entity], cursor):
+            progress.advance(1)
+    finally:
+        conn.close()
+    progress.report()
+    return progress.rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import/export of books and authors.")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('entity', choices=sorted(FIELDS))
+    parser.add_argument('path', help="CSV or NDJSON file, '-' for stdin/stdout")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], dest='fmt')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--commit-every', type=int, default=500000)
+    parser.add_argument('--progress-every', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    fmt = _detect_format(args.path, args.fmt)
+    progress = Progress(f"{args.command} {args.entity}", args.progress_every)
+    if args.command == 'import':
+        with _open(args.path, 'r') as stream:
+            import_records(args.entity, read_records(stream, fmt), args.batch_size,
+                           args.commit_every, progress)
+    else:
+        with _open(args.path, 'w') as stream:
+            export_records(args.entity, stream, fmt, args.batch_size, progress)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
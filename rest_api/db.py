@@ -0,0 +1,141 @@
+"""
+Connection handling for the models.
+
+Inside a Flask request every model function shares one connection and one
+transaction (the unit of work), stored on `g`. It is committed when the
+response is successful and rolled back on an error status or an exception.
+Resource methods end it themselves through the `unit_of_work` decorator, so
+that the commit happens while admission control still holds the request's
+slot; the request hooks cover anything else.
+
+Write requests take the write lock up front with BEGIN IMMEDIATE: a deferred
+transaction that reads first cannot upgrade while another writer holds the
+lock and fails without waiting on the busy timeout. The database runs in WAL
+mode so that open read transactions do not hold up writer commits.
+
+Outside a request, e.g. when running `models.py` directly, each call gets its
+own connection that is committed and closed on exit.
+
+`init_app` switches the database to WAL and runs an optional schema setup
+callable once, before the app serves its first request however it is started
+(development server, WSGI server, test client), so existing databases are
+brought up to date without doing any work at import time.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional
+
+from flask import Flask, Response, g, has_request_context, request
+
+DATABASE: str = 'table_books.db'
+BUSY_TIMEOUT: float = 10.0
+
+READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+
+def _open_connection(immediate: bool = False) -> sqlite3.Connection:
+    conn = sqlite3.connect(DATABASE, timeout=BUSY_TIMEOUT)
+    # Has no effect inside a transaction, so it is set before BEGIN.
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    return conn
+
+
+@contextmanager
+def get_connection() -> Iterator[sqlite3.Connection]:
+    if has_request_context():
+        if 'db_conn' not in g:
+            g.db_conn = _open_connection(immediate=request.method not in READ_METHODS)
+        yield g.db_conn
+        return
+
+    conn = _open_connection()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _end_unit_of_work(commit: bool) -> None:
+    conn: Optional[sqlite3.Connection] = g.pop('db_conn', None)
+    if conn is None:
+        return
+    try:
+        if commit:
+            conn.commit()
+        else:
+            conn.rollback()
+    finally:
+        conn.close()
+
+
+def _status_code(rv: Any) -> int:
+    if isinstance(rv, tuple) and len(rv) > 1 and isinstance(rv[1], int):
+        return rv[1]
+    return getattr(rv, 'status_code', 200)
+
+
+def unit_of_work(func: Callable) -> Callable:
+    """
+    Decorator for resource methods: commit or roll back as soon as the method
+    returns. List it before `admission.limit` in `Resource.method_decorators`
+    so that it runs inside the admitted region.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            rv = func(*args, **kwargs)
+        except BaseException:
+            _end_unit_of_work(commit=False)
+            raise
+        _end_unit_of_work(commit=_status_code(rv) < 400)
+        return rv
+    return wrapper
+
+
+def _commit_on_success(response: Response) -> Response:
+    _end_unit_of_work(commit=response.status_code < 400)
+    return response
+
+
+def _rollback_on_error(exc: Optional[BaseException]) -> None:
+    _end_unit_of_work(commit=False)
+
+
+def enable_wal() -> None:
+    """The journal mode is stored in the database file, so this is needed once."""
+    conn = sqlite3.connect(DATABASE, timeout=BUSY_TIMEOUT)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL;")
+    finally:
+        conn.close()
+
+
+def _prepare_before_first_request(app: Flask, setup: Optional[Callable[[], None]]) -> None:
+    state = app.extensions['db'] = {'ready': False}
+    lock = threading.Lock()
+    wsgi_app = app.wsgi_app
+
+    def wsgi_app_with_setup(environ, start_response):
+        if not state['ready']:
+            with lock:
+                if not state['ready']:
+                    enable_wal()
+                    if setup is not None:
+                        setup()
+                    state['ready'] = True
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = wsgi_app_with_setup
+
+
+def init_app(app: Flask, setup: Optional[Callable[[], None]] = None) -> None:
+    app.after_request(_commit_on_success)
+    app.teardown_request(_rollback_on_error)
+    _prepare_before_first_request(app, setup)
@@ -1,12 +1,9 @@
 from dataclasses import dataclass
 import sqlite3
-from typing import Any, Optional, List, Union
+from typing import Any, Dict, Optional, List, Union
 
+from db import get_connection
 
-def enable_foreign_keys(conn):
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA foreign_keys = ON;")
-    conn.commit()
 
 DATA: List[dict] = [
     {'id': 1, 'title': 'A Byte of Python', 'author': 1},
@@ -27,6 +24,7 @@ class Author:
     middle_name: str
     last_name: str
     author_id: Optional[int] = None
+    book_count: Optional[int] = None
 
     def __getitem__(self, item: str) -> Any:
         return getattr(self, item)
@@ -43,8 +41,7 @@ class Book:
 
 
 def init_db_authors(initial_records: List[dict]) -> None:
-    with sqlite3.connect('table_books.db') as conn:
-        enable_foreign_keys(conn)
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             """
@@ -75,8 +72,7 @@ def init_db_authors(initial_records: List[dict]) -> None:
             )
 
 def init_db_books(initial_records: List[dict]) -> None:
-    with sqlite3.connect('table_books.db') as conn:
-        enable_foreign_keys(conn)
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             """
@@ -106,6 +102,124 @@ def init_db_books(initial_records: List[dict]) -> None:
             )
 
 
+AUTHOR_STATS_TRIGGERS: Dict[str, str] = {
+    'trg_author_stats_author_insert': """
+        CREATE TRIGGER IF NOT EXISTS `trg_author_stats_author_insert`
+        AFTER INSERT ON `table_authors`
+        BEGIN
+            INSERT OR IGNORE INTO `author_stats` (author_id, book_count)
+            VALUES (NEW.author_id, 0);
+        END
+    """,
+    'trg_author_stats_author_delete': """
+        CREATE TRIGGER IF NOT EXISTS `trg_author_stats_author_delete`
+        AFTER DELETE ON `table_authors`
+        BEGIN
+            DELETE FROM `author_stats` WHERE author_id = OLD.author_id;
+        END
+    """,
+    'trg_author_stats_book_insert': """
+        CREATE TRIGGER IF NOT EXISTS `trg_author_stats_book_insert`
+        AFTER INSERT ON `table_books`
+        BEGIN
+            INSERT INTO `author_stats` (author_id, book_count) VALUES (NEW.author, 1)
+            ON CONFLICT (author_id) DO UPDATE SET book_count = book_count + 1;
+        END
+    """,
+    'trg_author_stats_book_delete': """
+        CREATE TRIGGER IF NOT EXISTS `trg_author_stats_book_delete`
+        AFTER DELETE ON `table_books`
+        BEGIN
+            UPDATE `author_stats` SET book_count = book_count - 1
+            WHERE author_id = OLD.author;
+        END
+    """,
+    'trg_author_stats_book_update': """
+        CREATE TRIGGER IF NOT EXISTS `trg_author_stats_book_update`
+        AFTER UPDATE OF author ON `table_books`
+        WHEN OLD.author IS NOT NEW.author
+        BEGIN
+            UPDATE `author_stats` SET book_count = book_count - 1
+            WHERE author_id = OLD.author;
+            INSERT INTO `author_stats` (author_id, book_count) VALUES (NEW.author, 1)
+            ON CONFLICT (author_id) DO UPDATE SET book_count = book_count + 1;
+        END
+    """,
+}
+
+
+def init_db_author_stats() -> None:
+    """
+    Create the `author_stats` table together with the triggers that keep it
+    in sync with `table_books`, so book counts per author are read by primary
+    key instead of being recomputed. Safe to call on an existing database:
+    the counts are recomputed whenever any of the triggers or the top-authors
+    index is missing, since writes made without the triggers were not tracked.
+    """
+    with get_connection() as conn:
+        cursor: sqlite3.Cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT name FROM sqlite_master
+            WHERE name IN ('table_authors', 'table_books', 'author_stats', 'idx_author_stats_top')
+               OR (type = 'trigger' AND name LIKE 'trg_author_stats_%');
+            """
+        )
+        existing = {name for (name,) in cursor.fetchall()}
+        if not {'table_authors', 'table_books'} <= existing:
+            return
+        if {'author_stats', 'idx_author_stats_top', *AUTHOR_STATS_TRIGGERS} <= existing:
+            return
+
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS `author_stats` (
+                author_id INTEGER PRIMARY KEY,
+                book_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Superseded by idx_author_stats_top, which also covers the tie-break.
+        cursor.execute("DROP INDEX IF EXISTS `idx_author_stats_book_count`")
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS `idx_author_stats_top`
+                ON `author_stats` (book_count DESC, author_id)
+            """
+        )
+        cursor.execute("DELETE FROM `author_stats`")
+        cursor.execute(
+            """
+            INSERT INTO `author_stats` (author_id, book_count)
+                SELECT a.author_id, COUNT(b.id)
+                FROM `table_authors` a
+                LEFT JOIN `table_books` b ON b.author = a.author_id
+                GROUP BY a.author_id
+            """
+        )
+        for statement in AUTHOR_STATS_TRIGGERS.values():
+            cursor.execute(statement)
+
+
+_SELECT_AUTHORS_WITH_STATS: str = """
+    SELECT a.author_id, a.first_name, a.middle_name, a.last_name,
+           COALESCE(s.book_count, 0)
+    FROM 'table_authors' a
+    LEFT JOIN 'author_stats' s ON s.author_id = a.author_id
+"""
+
+# Sorted listings are driven from author_stats so that SQLite walks
+# idx_author_stats_top in order and stops after LIMIT rows.
+AUTHOR_SORT_QUERIES: Dict[str, str] = {
+    'book_count': """
+        SELECT a.author_id, a.first_name, a.middle_name, a.last_name, s.book_count
+        FROM 'author_stats' s
+        JOIN 'table_authors' a ON a.author_id = s.author_id
+        ORDER BY s.book_count DESC, s.author_id
+    """,
+}
+
+
 def _get_book_obj_from_row(row) -> Book:
     book_id = row[0]
     title = row[1]
@@ -121,10 +235,10 @@ def _get_book_obj_from_row(row) -> Book:
     return book
 
 def _get_author_obj_from_row(row) -> Author:
-    return Author(author_id=row[0], first_name=row[1], middle_name=row[2], last_name=row[3])
+    return Author(author_id=row[0], first_name=row[1], middle_name=row[2], last_name=row[3], book_count=row[4])
 
 def get_all_books() -> List[Book]:
-    with sqlite3.connect('table_books.db') as conn:
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             """
@@ -134,20 +248,17 @@ def get_all_books() -> List[Book]:
         all_books: List[Book] = cursor.fetchall()
         return [_get_book_obj_from_row(row) for row in all_books]
 
-def get_all_authors() -> List[Author]:
-    with sqlite3.connect('table_books.db') as conn:
+def get_all_authors(sort: Optional[str] = None, limit: Optional[int] = None) -> List[Author]:
+    query = _SELECT_AUTHORS_WITH_STATS if sort is None else AUTHOR_SORT_QUERIES[sort]
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT * from 'table_authors'
-            """
-        )
+        # A negative LIMIT means no limit in SQLite.
+        cursor.execute(query + " LIMIT ?", (-1 if limit is None else limit,))
         all_authors: List[Author] = cursor.fetchall()
         return [_get_author_obj_from_row(row) for row in all_authors]
 
 def add_book(title: str, author_id: int) -> Book:
-    with sqlite3.connect('table_books.db') as conn:
-        enable_foreign_keys(conn)
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
             """
@@ -188,7 +299,7 @@ def add_book_with_author(book_data: dict) -> Book:
 
 
 def add_author(author: Author) -> Author:
-    with sqlite3.connect('table_books.db') as conn:
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             f"""
@@ -198,10 +309,11 @@ def add_author(author: Author) -> Author:
             (author.first_name, author.middle_name, author.last_name,),
         )
         author.author_id = cursor.lastrowid
+        author.book_count = 0
         return author
 
 def get_book_by_id(book_id: int) -> Optional[Book]:
-    with sqlite3.connect('table_books.db') as conn:
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(f"""SELECT * from 'table_books' WHERE id= "%s" """ % book_id)
         book = cursor.fetchone()
@@ -209,17 +321,16 @@ def get_book_by_id(book_id: int) -> Optional[Book]:
             return _get_book_obj_from_row(book)
 
 def get_author_by_id(author_id: int) -> Optional[Author]:
-    with sqlite3.connect('table_books.db') as conn:
-        enable_foreign_keys(conn)
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
-        cursor.execute(f"""SELECT * from 'table_authors' WHERE author_id= "%s" """ % author_id)
+        cursor.execute(_SELECT_AUTHORS_WITH_STATS + "WHERE a.author_id = ?", (author_id,))
         author = cursor.fetchone()
         if author:
             return _get_author_obj_from_row(author)
 
 
 def get_author_by_name(first_name: str, last_name: str, middle_name: Optional[str] = None) -> Optional[dict]:
-    with sqlite3.connect('table_books.db') as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         if middle_name:
             cursor.execute(
@@ -249,8 +360,7 @@ def get_author_by_name(first_name: str, last_name: str, middle_name: Optional[st
         else:
             return None
 def update_book_by_id(book: Book) -> Book:
-    with sqlite3.connect('table_books.db') as conn:
-        enable_foreign_keys(conn)
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             f"""
@@ -259,12 +369,10 @@ def update_book_by_id(book: Book) -> Book:
             WHERE id = ?
             """, (book.title, book.author, book.id),
         )
-        conn.commit()
         return book
 
 def update_author_by_id(author: Author) -> Author:
-    with sqlite3.connect('table_books.db') as conn:
-        enable_foreign_keys(conn)
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             f"""
@@ -273,10 +381,9 @@ def update_author_by_id(author: Author) -> Author:
                     WHERE author_id = ?
                     """, (author.first_name, author.middle_name, author.last_name, author.author_id),
         )
-        conn.commit()
 
 def delete_book_by_id(book_id: int) -> None:
-    with sqlite3.connect('table_books.db') as conn:
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             f"""
@@ -284,11 +391,9 @@ def delete_book_by_id(book_id: int) -> None:
             WHERE id = ?
             """, (book_id,)
         )
-        conn.commit()
 
 def delete_author_by_id(author_id: int) -> None:
-    with sqlite3.connect('table_books.db') as conn:
-        enable_foreign_keys(conn)
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             f"""
@@ -296,10 +401,9 @@ def delete_author_by_id(author_id: int) -> None:
                     WHERE author_id = ?
                     """, (author_id,)
         )
-        conn.commit()
 
 def get_book_by_title(title: str) -> Optional[Book]:
-    with sqlite3.connect('table_books.db') as conn:
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(f"SELECT * from 'table_books' WHERE title = '%s'" % title)
         book = cursor.fetchone()
@@ -307,8 +411,7 @@ def get_book_by_title(title: str) -> Optional[Book]:
             return _get_book_obj_from_row(book)
 
 def get_books_by_author_id(author_id: int) -> List[Book]:
-    with sqlite3.connect('table_books.db') as conn:
-        enable_foreign_keys(conn)
+    with get_connection() as conn:
         cursor: sqlite3.Cursor = conn.cursor()
         cursor.execute(
             """
@@ -322,4 +425,5 @@ def get_books_by_author_id(author_id: int) -> List[Book]:
 
 if __name__ == '__main__':
     init_db_authors(DATA_AUTHORS)
-    init_db_books(DATA)
\ No newline at end of file
+    init_db_books(DATA)
+    init_db_author_stats()
\ No newline at end of file
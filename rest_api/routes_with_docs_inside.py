@@ -11,11 +11,16 @@ from marshmallow import ValidationError
 
 from models import (get_all_books, get_all_authors, add_author, get_book_by_id, update_book_by_id,
                     delete_book_by_id, get_author_by_id, update_author_by_id, delete_author_by_id,
-                    get_books_by_author_id, Author, add_book_with_author)
+                    get_books_by_author_id, Author, add_book_with_author, init_db_author_stats,
+                    AUTHOR_SORT_QUERIES)
+import db
+from admission import AdmissionController
 from schemas import BookSchema, AuthorSchema, AuthorDetailSchema, BookDetailSchema
 
 app = Flask(__name__)
 api = Api(app)
+admission = AdmissionController(app)
+db.init_app(app, setup=init_db_author_stats)
 
 spec = APISpec(
     title='BookList API',
@@ -26,6 +31,8 @@ spec = APISpec(
 
 
 class BookList(Resource):
+    method_decorators = [db.unit_of_work, admission.limit]
+
     def get(self):
         """
             An endpoint that lists books
@@ -83,6 +90,8 @@ class BookList(Resource):
 
 
 class BookResource(Resource):
+    method_decorators = [db.unit_of_work, admission.limit]
+
     def get(self, book_id):
         """
             An endpoint that retrieves a book by id
@@ -194,12 +203,25 @@ class BookResource(Resource):
 
 
 class AuthorList(Resource):
+    method_decorators = [db.unit_of_work, admission.limit]
+
     def get(self):
         """
             An endpoint that lists authors
             ---
             tags:
               - authors
+            parameters:
+              - in: query
+                name: sort
+                type: string
+                enum: [book_count]
+                description: Sort authors by number of books, most prolific first
+              - in: query
+                name: limit
+                type: integer
+                minimum: 1
+                description: Return at most this many authors
             responses:
               200:
                 description: List of authors
@@ -207,9 +229,19 @@ class AuthorList(Resource):
                   type: array
                   items:
                     $ref: '#/definitions/Author'
+              400:
+                description: Unknown sort field or invalid limit
         """
+        sort = request.args.get('sort')
+        if sort is not None and sort not in AUTHOR_SORT_QUERIES:
+            abort(400, message=f"Unknown sort field {sort}")
+        limit = request.args.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                abort(400, message=f"Invalid limit {limit}")
+            limit = int(limit)
         schema = AuthorSchema(many=True)
-        return schema.dump(get_all_authors())
+        return schema.dump(get_all_authors(sort, limit))
 
     def post(self):
         """
@@ -242,6 +274,8 @@ class AuthorList(Resource):
 
 
 class AuthorResource(Resource):
+    method_decorators = [db.unit_of_work, admission.limit]
+
     def get(self, author_id):
         """
                     An endpoint that retrieves an author by id
@@ -343,6 +377,22 @@ class AuthorResource(Resource):
         return '', 204
 
 
+class AdmissionMetricsResource(Resource):
+    def get(self):
+        """
+            An endpoint that reports admission control counters per route
+            ---
+            tags:
+              - metrics
+            responses:
+              200:
+                description: Admitted, queued, rejected and rate limited request counts
+                schema:
+                  type: object
+        """
+        return admission.metrics.snapshot()
+
+
 template = spec.to_flasgger(
     app,
     definitions=[BookSchema]
@@ -354,6 +404,7 @@ api.add_resource(BookList, '/api/books')
 api.add_resource(BookResource, '/api/books/<book_id>')
 api.add_resource(AuthorList, '/api/authors')
 api.add_resource(AuthorResource, '/api/authors/<author_id>')
+api.add_resource(AdmissionMetricsResource, '/api/metrics/admission')
 
 if __name__ == '__main__':
     WSGIRequestHandler.protocol_version = "HTTP/1.1"
@@ -8,6 +8,7 @@ class AuthorSchema(Schema):
     first_name = fields.Str(required=True)
     middle_name = fields.Str()
     last_name = fields.Str(required=True)
+    book_count = fields.Int(dump_only=True)
 
     @validates('first_name')
     def validate_first_name(self, first_name):
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh `table_books.db` seeded with the sample data, in a temp directory."""
+    monkeypatch.chdir(tmp_path)
+    models.init_db_authors(models.DATA_AUTHORS)
+    models.init_db_books(models.DATA)
+    models.init_db_author_stats()
+    return tmp_path / 'table_books.db'
+
+
+@pytest.fixture
+def app_config():
+    """Give a test free rein over the app config; restored with fresh limiters afterwards."""
+    import routes_with_docs_inside as routes
+
+    saved = dict(routes.app.config)
+    yield routes.app.config
+    routes.app.config.clear()
+    routes.app.config.update(saved)
+    routes.admission.init_app(routes.app)
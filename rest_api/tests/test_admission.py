@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+from flask import request
+
+import routes_with_docs_inside as routes
+from admission import AdmissionMetrics, ConcurrencyLimiter, TokenBucketLimiter
+
+
+@pytest.fixture
+def app(database, app_config, monkeypatch):
+    monkeypatch.setattr(routes.admission, 'metrics', AdmissionMetrics())
+    app_config.update(
+        ADMISSION_READ_CONCURRENCY=1,
+        ADMISSION_WRITE_CONCURRENCY=1,
+        ADMISSION_QUEUE_SIZE=1,
+        ADMISSION_QUEUE_TIMEOUT=0.2,
+        ADMISSION_RETRY_AFTER=3,
+        RATE_LIMIT_PER_SECOND=1000.0,
+        RATE_LIMIT_BURST=1000,
+    )
+    routes.admission.init_app(routes.app)
+    return routes.app
+
+
+@pytest.fixture
+def blocked_reads(monkeypatch):
+    """Make GET /api/books/<id> hold its slot until the event is set."""
+    release = threading.Event()
+    get_book_by_id = routes.get_book_by_id
+
+    def slow_get_book_by_id(book_id):
+        if request.method == 'GET':
+            release.wait(5)
+        return get_book_by_id(book_id)
+
+    monkeypatch.setattr(routes, 'get_book_by_id', slow_get_book_by_id)
+    yield release
+    release.set()
+
+
+def _in_background(app, path):
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.setdefault('status', app.test_client().get(path).status_code)
+    )
+    thread.start()
+    return thread, result
+
+
+def _wait_for(predicate):
+    deadline = time.monotonic() + 2
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_concurrency_limiter_queue_and_timeout():
+    limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=0.05)
+    queued = []
+    assert limiter.acquire(lambda: queued.append(1))
+    assert not limiter.acquire(lambda: queued.append(1))
+    assert queued == [1]
+    limiter.release()
+    assert limiter.acquire(lambda: queued.append(1))
+    assert queued == [1]
+
+
+def test_token_bucket_limits_and_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('admission.time.monotonic', lambda: now[0])
+    bucket = TokenBucketLimiter(rate=2.0, burst=2, max_clients=10)
+    assert bucket.take('a') == 0
+    assert bucket.take('a') == 0
+    assert bucket.take('a') == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.take('a') == 0
+
+
+def test_token_bucket_caps_number_of_clients():
+    bucket = TokenBucketLimiter(rate=1.0, burst=1, max_clients=100)
+    for client in range(100000):
+        bucket.take(str(client))
+    assert len(bucket) == 100
+
+
+@pytest.mark.parametrize('rate, burst, max_clients', [(0, 1, 1), (-1, 1, 1), (1, 0, 1), (1, 1, 0)])
+def test_token_bucket_rejects_invalid_config(rate, burst, max_clients):
+    with pytest.raises(ValueError):
+        TokenBucketLimiter(rate, burst, max_clients)
+
+
+def test_full_queue_returns_503_with_retry_after(app, blocked_reads):
+    app.config['ADMISSION_QUEUE_SIZE'] = 0
+    routes.admission.init_app(app)
+    thread, result = _in_background(app, '/api/books/1')
+    _wait_for(lambda: routes.admission.metrics.snapshot().get('bookresource:read', {}).get('admitted'))
+
+    response = app.test_client().get('/api/books/2')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    blocked_reads.set()
+    thread.join()
+    assert result['status'] == 200
+
+
+def test_queued_request_times_out(app, blocked_reads):
+    thread, _ = _in_background(app, '/api/books/1')
+    _wait_for(lambda: routes.admission.metrics.snapshot().get('bookresource:read', {}).get('admitted'))
+
+    started = time.monotonic()
+    response = app.test_client().get('/api/books/2')
+
+    assert response.status_code == 503
+    assert time.monotonic() - started >= 0.2
+    blocked_reads.set()
+    thread.join()
+    assert routes.admission.metrics.snapshot()['bookresource:read'] == {
+        'admitted': 1, 'queued': 1, 'rejected': 1, 'rate_limited': 0,
+    }
+
+
+def test_writes_have_separate_budget(app, blocked_reads):
+    thread, _ = _in_background(app, '/api/books/1')
+    _wait_for(lambda: routes.admission.metrics.snapshot().get('bookresource:read', {}).get('admitted'))
+
+    response = app.test_client().delete('/api/books/3')
+
+    assert response.status_code == 204
+    blocked_reads.set()
+    thread.join()
+
+
+def test_rate_limit_returns_429(app):
+    app.config.update(RATE_LIMIT_PER_SECOND=0.5, RATE_LIMIT_BURST=2)
+    routes.admission.init_app(app)
+    client = app.test_client()
+
+    statuses = [client.get('/api/books').status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+    response = client.get('/api/books')
+    assert response.headers['Retry-After'] == '2'
+
+
+def test_metrics_endpoint(app):
+    client = app.test_client()
+    client.get('/api/books')
+    client.get('/api/authors/1')
+
+    response = client.get('/api/metrics/admission')
+
+    assert response.status_code == 200
+    assert response.json == {
+        'booklist:read': {'admitted': 1, 'queued': 0, 'rejected': 0, 'rate_limited': 0},
+        'authorresource:read': {'admitted': 1, 'queued': 0, 'rejected': 0, 'rate_limited': 0},
+    }
@@ -0,0 +1,125 @@
+import sqlite3
+
+import models
+from models import Author
+
+
+def _book_counts():
+    return {author.author_id: author.book_count for author in models.get_all_authors()}
+
+
+def test_backfill_counts_existing_books(database):
+    assert _book_counts() == {1: 1, 2: 1, 3: 1}
+
+
+def test_new_author_starts_at_zero(database):
+    author = models.add_author(Author(first_name='Jane', middle_name='', last_name='Austen'))
+    assert models.get_author_by_id(author.author_id).book_count == 0
+
+
+def test_insert_book_increments(database):
+    models.add_book('Anna Karenina', 3)
+    assert _book_counts()[3] == 2
+
+
+def test_update_book_author_moves_count(database):
+    book = models.get_book_by_id(3)
+    book.author = 1
+    models.update_book_by_id(book)
+    assert _book_counts() == {1: 2, 2: 1, 3: 0}
+
+
+def test_delete_book_decrements(database):
+    models.delete_book_by_id(2)
+    assert _book_counts()[2] == 0
+
+
+def test_cascade_delete_removes_stats(database):
+    models.add_book('Anna Karenina', 3)
+    models.delete_author_by_id(3)
+    assert _book_counts() == {1: 1, 2: 1}
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("SELECT * FROM author_stats WHERE author_id = 3").fetchall() == []
+
+
+def test_sort_by_book_count(database):
+    models.add_book('Anna Karenina', 3)
+    authors = models.get_all_authors('book_count')
+    assert [author.author_id for author in authors] == [3, 1, 2]
+
+
+def test_missing_trigger_rebuilds_counts(database):
+    with sqlite3.connect(database) as conn:
+        conn.execute("DROP TRIGGER trg_author_stats_book_insert")
+    models.add_book('Anna Karenina', 3)
+    assert _book_counts()[3] == 1
+
+    models.init_db_author_stats()
+    assert _book_counts()[3] == 2
+
+
+def test_skips_database_without_base_tables(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    models.init_db_author_stats()
+    with sqlite3.connect(tmp_path / 'table_books.db') as conn:
+        assert conn.execute("SELECT name FROM sqlite_master").fetchall() == []
+
+
+def test_app_creates_author_stats_before_first_request(tmp_path, monkeypatch):
+    import routes_with_docs_inside as routes
+
+    monkeypatch.chdir(tmp_path)
+    models.init_db_authors(models.DATA_AUTHORS)
+    models.init_db_books(models.DATA)
+    monkeypatch.setitem(routes.app.extensions['db'], 'ready', False)
+    client = routes.app.test_client()
+
+    assert client.get('/api/authors').status_code == 200
+    assert client.get('/api/authors/1').json['book_count'] == 1
+    assert client.get('/api/books/1').status_code == 200
+
+
+def test_top_authors_limit(database):
+    models.add_book('Anna Karenina', 3)
+    models.add_book('Learn Python', 1)
+    models.add_book('Resurrection', 3)
+    authors = models.get_all_authors('book_count', limit=2)
+    assert [(author.author_id, author.book_count) for author in authors] == [(3, 3), (1, 2)]
+
+
+def test_top_authors_query_uses_index(database):
+    with sqlite3.connect(database) as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN " + models.AUTHOR_SORT_QUERIES['book_count'] + " LIMIT 10"
+        ).fetchall()
+    details = ' '.join(row[-1] for row in plan)
+    assert 'idx_author_stats_top' in details
+    assert 'TEMP B-TREE' not in details
+
+
+def test_init_replaces_superseded_index(database):
+    with sqlite3.connect(database) as conn:
+        conn.execute("DROP INDEX idx_author_stats_top")
+        conn.execute("CREATE INDEX idx_author_stats_book_count ON author_stats (book_count)")
+
+    models.init_db_author_stats()
+
+    with sqlite3.connect(database) as conn:
+        indexes = conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'author_stats' "
+                               "AND type = 'index' AND sql IS NOT NULL").fetchall()
+    assert indexes == [('idx_author_stats_top',)]
+
+
+def test_authors_endpoint_sort_and_limit(database):
+    import routes_with_docs_inside as routes
+
+    client = routes.app.test_client()
+    models.add_book('Anna Karenina', 3)
+
+    response = client.get('/api/authors?sort=book_count&limit=1')
+
+    assert response.status_code == 200
+    assert [author['author_id'] for author in response.json] == [3]
+    assert client.get('/api/authors?limit=0').status_code == 400
+    assert client.get('/api/authors?limit=abc').status_code == 400
+    assert client.get('/api/authors?sort=title').status_code == 400
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+import catalog_cli
+import models
+from models import Author
+
+
+def _run(*argv):
+    assert catalog_cli.main(list(argv)) == 0
+
+
+def _authors(database):
+    with sqlite3.connect(database) as conn:
+        return conn.execute(
+            "SELECT first_name, middle_name, last_name FROM table_authors ORDER BY author_id"
+        ).fetchall()
+
+
+def _book_counts():
+    return {author.author_id: author.book_count for author in models.get_all_authors()}
+
+
+@pytest.mark.parametrize('path', ['authors.csv', 'authors.ndjson'])
+def test_authors_round_trip_does_not_duplicate(database, path):
+    models.add_author(Author(first_name='No', middle_name=None, last_name='Middle'))
+    models.add_author(Author(first_name='Empty', middle_name='', last_name='Middle'))
+    before = _authors(database)
+
+    _run('export', 'authors', path)
+    _run('import', 'authors', path)
+
+    assert _authors(database) == before
+
+
+def test_empty_middle_name_is_stored_as_null(database, tmp_path):
+    (tmp_path / 'authors.csv').write_text("first_name,middle_name,last_name\nJane,,Austen\n")
+
+    _run('import', 'authors', 'authors.csv')
+
+    assert _authors(database)[-1] == ('Jane', None, 'Austen')
+
+
+def test_books_import_creates_authors_and_updates_stats(database, tmp_path):
+    (tmp_path / 'books.ndjson').write_text(
+        '{"title": "Emma", "first_name": "Jane", "last_name": "Austen"}\n'
+        '{"title": "Persuasion", "first_name": "Jane", "middle_name": "", "last_name": "Austen"}\n'
+        '{"title": "War and Peace", "first_name": "Lev", "middle_name": "Nikolaevich", "last_name": "Tolstoi"}\n'
+        '{"title": "", "first_name": "No", "last_name": "Title"}\n'
+    )
+
+    _run('import', 'books', 'books.ndjson')
+    _run('import', 'books', 'books.ndjson')
+
+    assert _authors(database)[-1] == ('Jane', None, 'Austen')
+    assert _book_counts() == {1: 1, 2: 1, 3: 1, 4: 2}
+
+
+def test_failed_import_restores_triggers_and_counts(database):
+    def records():
+        yield {'title': 'Emma', 'first_name': 'Jane', 'last_name': 'Austen'}
+        yield {'title': 'Anna Karenina', 'first_name': 'Lev', 'middle_name': 'Nikolaevich',
+               'last_name': 'Tolstoi'}
+        raise RuntimeError('interrupted')
+
+    progress = catalog_cli.Progress('import books', 1000)
+    with pytest.raises(RuntimeError):
+        catalog_cli.import_records('books', records(), batch_size=1, commit_every=1,
+                                   progress=progress)
+
+    assert _book_counts() == {1: 1, 2: 1, 3: 2, 4: 1}
+    models.add_book('Sense and Sensibility', 4)
+    assert _book_counts()[4] == 2
+
+
+def test_killed_import_is_repaired_on_next_init(database):
+    with sqlite3.connect(database) as conn:
+        conn.execute("DROP TRIGGER trg_author_stats_book_insert")
+        conn.execute("INSERT INTO table_books (title, author) VALUES ('Anna Karenina', 3)")
+
+    models.init_db_author_stats()
+
+    assert _book_counts()[3] == 2
@@ -0,0 +1,125 @@
+import sqlite3
+import threading
+
+import pytest
+
+import db
+import routes_with_docs_inside as routes
+
+
+@pytest.fixture
+def app(database, app_config, monkeypatch):
+    # The fixture database is already set up; skip the first-request setup.
+    monkeypatch.setitem(routes.app.extensions['db'], 'ready', True)
+    db.enable_wal()
+    app_config.update(
+        ADMISSION_WRITE_CONCURRENCY=8,
+        RATE_LIMIT_PER_SECOND=1000.0,
+        RATE_LIMIT_BURST=1000,
+        PROPAGATE_EXCEPTIONS=False,
+    )
+    routes.admission.init_app(routes.app)
+    return routes.app
+
+
+@pytest.fixture
+def opened_connections(monkeypatch):
+    opened = []
+    open_connection = db._open_connection
+
+    def counting_open_connection(*args, **kwargs):
+        conn = open_connection(*args, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(db, '_open_connection', counting_open_connection)
+    return opened
+
+
+def _book_payload(title, author_id=1):
+    return {'title': title, 'author': {'author_id': author_id, 'first_name': 'C',
+                                       'middle_name': 'H', 'last_name': 'Swaroop'}}
+
+
+def test_request_uses_one_connection(app, opened_connections):
+    response = app.test_client().put('/api/books/1', json=_book_payload('Python Bytes'))
+
+    assert response.status_code == 200
+    assert len(opened_connections) == 1
+
+
+def test_failed_request_rolls_back(app, database, monkeypatch):
+    def failing_update(book):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(routes, 'update_book_by_id', failing_update)
+    payload = _book_payload('Python Bytes', author_id=999)
+    payload['author'].update(first_name='New', last_name='Author')
+
+    response = app.test_client().put('/api/books/1', json=payload)
+
+    assert response.status_code == 500
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("SELECT * FROM table_authors WHERE first_name = 'New'").fetchall() == []
+
+
+def test_concurrent_writers_do_not_fail(app):
+    statuses = []
+
+    def put_many(worker):
+        client = app.test_client()
+        for i in range(30):
+            response = client.put('/api/books/1', json=_book_payload(f'Title {worker}-{i}'))
+            statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=put_many, args=(worker,)) for worker in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * 60
+
+
+def test_write_slot_is_held_until_commit(app, monkeypatch):
+    app.config.update(ADMISSION_WRITE_CONCURRENCY=1, ADMISSION_QUEUE_SIZE=0)
+    routes.admission.init_app(app)
+    monkeypatch.setattr(db, 'BUSY_TIMEOUT', 0.5)
+    committing = threading.Event()
+    release = threading.Event()
+    end_unit_of_work = db._end_unit_of_work
+
+    def slow_end_unit_of_work(commit):
+        if commit and not committing.is_set():
+            committing.set()
+            release.wait(5)
+        end_unit_of_work(commit)
+
+    monkeypatch.setattr(db, '_end_unit_of_work', slow_end_unit_of_work)
+    first = {}
+    thread = threading.Thread(target=lambda: first.setdefault(
+        'status', app.test_client().put('/api/books/1', json=_book_payload('First')).status_code
+    ))
+    thread.start()
+    assert committing.wait(2)
+
+    response = app.test_client().put('/api/books/2', json=_book_payload('Second', author_id=2))
+
+    release.set()
+    thread.join()
+    assert response.status_code == 503
+    assert first['status'] == 200
+
+
+def test_wal_is_enabled_once_before_first_request(database, monkeypatch):
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ('delete',)
+    db._open_connection().close()
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ('delete',)
+
+    monkeypatch.setitem(routes.app.extensions['db'], 'ready', False)
+    assert routes.app.test_client().get('/api/books/1').status_code == 200
+
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ('wal',)